@@ -30,15 +30,15 @@ import torch
 import torch.distributed as t_d
 import torch.multiprocessing as mp
 import copy
-import numpy as np
 import math
+from torch.func import functional_call, vmap
 from darwinn.utils.fitness import compute_centered_ranks
 from darwinn.utils.fitness import compute_normalized_ranks
 from darwinn.utils.noise import *
 
 class DarwiNNOptimizer(object):
     """Abstract class for optimizer functions"""
-    def __init__(self, environment, model, criterion, popsize=100, data_parallel=False):
+    def __init__(self, environment, model, criterion, popsize=100, data_parallel=False, mixed_precision=False, cuda_graph=False, compile_fitness=False):
         #Disable Autograd
         torch.autograd.set_grad_enabled(False)
         #set environment
@@ -56,7 +56,8 @@ class DarwiNNOptimizer(object):
         print("NE Optimizer parameters: population=",self.popsize,", folds=",self.folds)
         #define data structures to hold fitness values
         self.fitness_global = torch.empty((self.popsize,), device=self.environment.device)
-        self.fitness_list = list(torch.chunk(self.fitness_global,self.nodes,dim=0))
+        #popsize is divisible by the number of nodes, so each node owns exactly folds fitness values
+        self.fitness_list = [self.fitness_global[i*self.folds:(i+1)*self.folds] for i in range(self.nodes)]
         self.fitness_local = self.fitness_list[self.environment.rank if self.nodes != 1 else 0]
         #initialize model and theta
         self.model_adapt = model
@@ -66,6 +67,20 @@ class DarwiNNOptimizer(object):
             self.model_adapt.cuda()
         self.num_parameters = self.count_num_parameters()
         self.criterion = criterion
+        #record parameter layout, used to unflatten theta into named parameter tensors
+        self.param_names, self.param_shapes, self.param_sizes = zip(*[(n, p.shape, p.numel()) for n, p in self.model.named_parameters()])
+        #models with buffers (e.g. BatchNorm running stats) update them in-place during forward, which vmap cannot batch
+        self.vectorized_eval = len(list(self.model.buffers())) == 0
+        #optionally evaluate fitness in BF16; theta, gradients and fitness values remain FP32
+        self.mixed_precision = mixed_precision
+        self.population_criterion = vmap(self.eval_params, in_dims=(0, None, None), randomness="different")
+        self.output_criterion = vmap(self.criterion, in_dims=(0, None))
+        #optionally compile the vectorized fitness evaluation into fused kernels
+        if compile_fitness:
+            self.population_criterion = torch.compile(self.population_criterion, fullgraph=True)
+        #optionally capture the vectorized fitness evaluation in a CUDA graph on first use and replay it afterwards
+        self.cuda_graph = cuda_graph and self.environment.cuda and self.vectorized_eval
+        self.eval_graph = None
         self.theta = torch.empty((self.num_parameters), device=self.environment.device)
         self.update_theta()
         self.loss = 0
@@ -82,6 +97,8 @@ class DarwiNNOptimizer(object):
         self.mutate()
         self.eval_fitness(data, target)
         self.environment.synchronize(self.fitness_local,mode=self.fitness_sync_mode,lst=self.fitness_list)
+        #derive the loss from the synchronized fitness rather than reducing it in a separate collective
+        self.loss = torch.mean(self.fitness_global if self.fitness_sync_mode == "GATHER" else self.fitness_local).item()
         self.select()
         self.adapt()
         self.generation += 1
@@ -108,22 +125,62 @@ class DarwiNNOptimizer(object):
         raise NotImplementedError
 
     def count_num_parameters(self):
-        orig_params = []
-        for param in self.model.parameters():
-            p = param.data.cpu().numpy()
-            orig_params.append(p.flatten())
-        orig_params_flat = np.concatenate(orig_params)
-        return len(orig_params_flat)
+        return sum(p.numel() for p in self.model.parameters())
 
-    """Updates the NN model from the value of Theta"""
+    """Unflattens Theta (or a stack of Thetas) into a dict of named parameter tensors"""
+    def unflatten(self, theta):
+        chunks = theta.split(self.param_sizes, dim=-1)
+        return {n: c.reshape(theta.shape[:-1] + s) for n, c, s in zip(self.param_names, chunks, self.param_shapes)}
+
+    """Evaluates the loss of the model with the given named parameters"""
+    def eval_params(self, params, data, target):
+        return self.criterion(functional_call(self.model, params, (data,)), target)
+
+    """Evaluates each row of thetas into the local fitness vector, replaying the captured CUDA graph if possible"""
+    def eval_population(self, thetas, data, target):
+        if self.cuda_graph and self.eval_graph is None:
+            self.capture_population(thetas, data, target)
+        #the graph is bound to the addresses of thetas and to the batch shape (the last batch of an epoch may be smaller)
+        if self.eval_graph is not None and self.graph_key == (thetas.data_ptr(), thetas.shape, data.shape, target.shape):
+            self.static_data.copy_(data)
+            self.static_target.copy_(target)
+            self.eval_graph.replay()
+        else:
+            self.compute_fitness(thetas, data, target)
+
+    """Captures the fitness evaluation into a CUDA graph reading from static input buffers"""
+    def capture_population(self, thetas, data, target):
+        self.static_data = data.clone()
+        self.static_target = target.clone()
+        #warm up on a side stream before capture, as required by torch.cuda.graph
+        stream = torch.cuda.Stream()
+        stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(stream):
+            self.compute_fitness(thetas, self.static_data, self.static_target)
+        torch.cuda.current_stream().wait_stream(stream)
+        self.eval_graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(self.eval_graph):
+            self.compute_fitness(thetas, self.static_data, self.static_target)
+        self.graph_key = (thetas.data_ptr(), thetas.shape, data.shape, target.shape)
+
+    """Evaluates each row of thetas into the local fitness vector"""
+    def compute_fitness(self, thetas, data, target):
+        with torch.autocast(self.environment.device.type, dtype=torch.bfloat16, enabled=self.mixed_precision, cache_enabled=False):
+            if self.vectorized_eval:
+                #data is shared by all folds; vmap lowers batched-weight convolutions to a single grouped convolution
+                #and batched-weight linear layers to a single batched matmul, so no per-fold kernel launches remain
+                self.fitness_local.copy_(self.population_criterion(self.unflatten(thetas), data, target))
+            else:
+                #forward passes run sequentially, but losses are computed on-device in one batched criterion call
+                outputs = []
+                for i in range(self.folds):
+                    self.update_model(thetas[i])
+                    outputs.append(functional_call(self.model, self.param_dict, (data,)))
+                self.fitness_local.copy_(self.output_criterion(torch.stack(outputs), target))
+
+    """Updates the NN model parameters from the value of Theta, without mutating the model"""
     def update_model(self, theta):
-        idx = 0
-        for param in self.model.parameters():
-            flattened_dim = param.numel()
-            temp = theta[idx:idx+flattened_dim]
-            temp = temp.view_as(param)
-            param.data = temp.data
-            idx += flattened_dim
+        self.param_dict = self.unflatten(theta)
 
     """Updates the NN model gradients"""
     def update_grad(self, grad):
@@ -137,11 +194,7 @@ class DarwiNNOptimizer(object):
 
     """Updates Theta from the NN model"""
     def update_theta(self):
-        idx = 0
-        for param in self.model_adapt.parameters():
-            flattened_dim = param.numel()
-            self.theta[idx:idx+flattened_dim] = param.data.flatten()
-            idx += flattened_dim
+        torch.cat([param.data.flatten() for param in self.model_adapt.parameters()], out=self.theta)
             
     def eval_theta(self, data, target):
         output = self.model_adapt(data)
@@ -153,8 +206,8 @@ class DarwiNNOptimizer(object):
     
 class OpenAIESOptimizer(DarwiNNOptimizer):
     """Implements Open-AI ES optimizer"""
-    def __init__(self, environment, model, criterion, optimizer, distribution="Gaussian", sampling="Antithetic", sigma=0.1, popsize=100, data_parallel=False, semi_updates=False, orthogonal_updates=False):
-        super(OpenAIESOptimizer,self).__init__(environment, model, criterion, popsize, data_parallel)
+    def __init__(self, environment, model, criterion, optimizer, distribution="Gaussian", sampling="Antithetic", sigma=0.1, popsize=100, data_parallel=False, semi_updates=False, orthogonal_updates=False, mixed_precision=False, cuda_graph=False, compile_fitness=False):
+        super(OpenAIESOptimizer,self).__init__(environment, model, criterion, popsize, data_parallel, mixed_precision, cuda_graph, compile_fitness)
         self.optimizer = optimizer
         self.distribution = distribution
         self.sampling = sampling
@@ -171,7 +224,9 @@ class OpenAIESOptimizer(DarwiNNOptimizer):
         else:
             gradients_len = self.num_parameters
         self.gradient = torch.empty((gradients_len), device=self.environment.device)
-        self.gradient_list = list(torch.chunk(self.gradient,self.nodes,dim=0))
+        #slice by explicit offsets; torch.chunk may return fewer than nodes chunks when the length is not divisible
+        gradient_slice_size = math.ceil(gradients_len/self.nodes)
+        self.gradient_list = [self.gradient[i*gradient_slice_size:(i+1)*gradient_slice_size] for i in range(self.nodes)]
         self.gradient_local = self.gradient_list[self.environment.rank if self.nodes != 1 else 0]
         #configure theta updates
         if data_parallel and (orthogonal_updates or semi_updates):
@@ -204,7 +259,7 @@ class OpenAIESOptimizer(DarwiNNOptimizer):
             self.mutate_noise_mode = NoiseMode.SLICE_H #for DPP, mutate just population assigned to local node
         self.epsilon = NoiseGenerator(self.popsize, self.num_parameters, self.environment.device, self.environment.number_nodes, self.environment.rank, distribution=self.distribution, sampling=self.sampling, mutate_mode=self.mutate_noise_mode, update_mode=self.update_noise_mode)
         #temporary variables
-        self.theta_noisy = None
+        self.theta_noisy = torch.empty((self.folds, self.num_parameters), device=self.environment.device)
         self.fitness_shaped = None
         #define random distribution
         if (self.distribution == "Gaussian"):
@@ -216,79 +271,80 @@ class OpenAIESOptimizer(DarwiNNOptimizer):
 
     def select(self):
         self.fitness_shaped = compute_centered_ranks(-self.fitness_for_update, device=self.environment.device)
+        #fold gradient normalization into the (small) shaped fitness vector
+        self.fitness_shaped /= self.sigma * self.popsize
 
     def adapt(self):
-        #compute gradient (with optional synchronization)
+        #compute normalized gradient (with optional synchronization)
         torch.mv(self.epsilon.generate_update_noise().t(), self.fitness_shaped, out=self.gradient_for_update)
-        #synchronize gradient
-        self.environment.synchronize(self.gradient_for_sync, mode=self.gradient_sync_mode, lst=self.gradient_list)
-        #normalize gradient
-        self.gradient /= self.sigma * self.popsize
+        #synchronize gradient asynchronously
+        handle = self.environment.synchronize(self.gradient_for_sync, mode=self.gradient_sync_mode, lst=self.gradient_list, async_op=True)
+        #overlap the collective with noise generation for the next generation
+        self.epsilon.step()
+        self.epsilon.generate_mutate_noise()
+        if handle is not None:
+            handle.wait()
         #use gradients to update model and then get new theta
         self.update_grad(-self.gradient)
         self.optimizer.step()
         self.update_theta()
     
     def mutate(self):
-        self.epsilon.step()
-        self.theta_noisy = self.theta + self.epsilon.generate_mutate_noise()*self.sigma
+        #noise generator is advanced at the end of adapt()
+        torch.mul(self.epsilon.generate_mutate_noise(), self.sigma, out=self.theta_noisy)
+        self.theta_noisy += self.theta
     
     def eval_fitness(self, data, target):
-        for i in range(self.folds):
-            self.update_model(self.theta_noisy[i])
-            output = self.model(data)
-            self.fitness_local[i] = self.criterion(output, target).item()
-        self.loss = torch.mean(self.fitness_local).item()
+        self.eval_population(self.theta_noisy, data, target)
 
 class GAOptimizer(DarwiNNOptimizer):
     """Implements a simple Genetic Algorithm optimizer"""
-    def __init__(self, environment, model, criterion, sigma=0.1, popsize=100, elite_ratio=0.1, mutation_probability=0.01, data_parallel=False):
-        super(GAOptimizer,self).__init__(environment, model, criterion, popsize, data_parallel)
+    def __init__(self, environment, model, criterion, sigma=0.1, popsize=100, elite_ratio=0.1, mutation_probability=0.01, data_parallel=False, mixed_precision=False, cuda_graph=False, compile_fitness=False):
+        super(GAOptimizer,self).__init__(environment, model, criterion, popsize, data_parallel, mixed_precision, cuda_graph, compile_fitness)
         self.fold_offset = self.environment.rank*self.folds
         self.num_elites = int(self.popsize*elite_ratio)
         self.elites = torch.zeros((self.num_elites,self.num_parameters), device=self.environment.device)
         self.population = torch.zeros((self.popsize,self.num_parameters), device=self.environment.device)
+        #scratch buffer reused every generation for second parents and mutation noise
+        self.num_children = self.popsize - self.num_elites
+        self.scratch = torch.empty((self.num_children,self.num_parameters), device=self.environment.device)
+        self.parent1_select = torch.empty((self.num_children,self.num_parameters), dtype=torch.bool, device=self.environment.device)
         self.sigma = sigma
 
     def select(self):
         #sort by fitness
         fitness_sorted, ind = self.fitness_global.sort()
         #select elites from population using indices of top fitnesses
-        self.elites = torch.index_select(self.population,0,ind[:self.num_elites])   
+        torch.index_select(self.population,0,ind[:self.num_elites],out=self.elites)
                 
     def mutate(self):
         #elites are inherited
-        for i in range(self.num_elites):
-            self.population[i] = self.elites[i]
-        #rest of population is generated
-        for i in range(self.num_elites,self.popsize):
-            idx1 = torch.randint(0,self.num_elites,(1,),device=self.environment.device)
-            idx2 = torch.randint(0,self.num_elites,(1,),device=self.environment.device)
-            parent_1 = self.elites[idx1.item()]
-            parent_2 = self.elites[idx2.item()]
-            parent1_select = torch.randint(0,2,(self.num_parameters,), dtype=torch.float, device=self.environment.device)
-            parent2_select = (parent1_select - 1.0) * -1.0
-            #crossover
-            self.population[i] = self.elites[idx1.item()] * parent1_select
-            self.population[i] += parent_2 * parent2_select
-            #mutation
-            self.population[i] += torch.randn((self.num_parameters,), device=self.environment.device)*self.sigma
+        self.population[:self.num_elites] = self.elites
+        #rest of population is generated in one batch, in-place in the population buffer
+        idx1 = torch.randint(0,self.num_elites,(self.num_children,),device=self.environment.device)
+        idx2 = torch.randint(0,self.num_elites,(self.num_children,),device=self.environment.device)
+        #draw crossover bits directly into a 1-byte bool mask
+        self.parent1_select.random_(2)
+        #crossover
+        children = self.population[self.num_elites:]
+        torch.index_select(self.elites,0,idx1,out=children)
+        torch.index_select(self.elites,0,idx2,out=self.scratch)
+        torch.where(self.parent1_select, children, self.scratch, out=children)
+        #mutation
+        torch.randn((self.num_children,self.num_parameters), device=self.environment.device, out=self.scratch)
+        children.add_(self.scratch, alpha=self.sigma)
 
     def adapt(self):
         pass
 
     def eval_fitness(self, data, target):
-        for i in range(self.folds):
-            self.update_model(self.population[self.fold_offset+i])
-            output = self.model(data)
-            self.fitness_local[i] = self.criterion(output, target).item()
-        self.loss = torch.mean(self.fitness_local).item()
+        self.eval_population(self.population[self.fold_offset:self.fold_offset+self.folds], data, target)
 
 class SNESOptimizer(OpenAIESOptimizer):
     """Implements Open-AI ES optimizer"""
-    def __init__(self, environment, model, criterion, optimizer, distribution="Gaussian", sampling="Antithetic", sigma=0.1, popsize=100, data_parallel=False, semi_updates=False, orthogonal_updates=False):
+    def __init__(self, environment, model, criterion, optimizer, distribution="Gaussian", sampling="Antithetic", sigma=0.1, popsize=100, data_parallel=False, semi_updates=False, orthogonal_updates=False, mixed_precision=False, cuda_graph=False, compile_fitness=False):
         print(distribution)
-        super().__init__(environment, model, criterion, optimizer, distribution, sampling, sigma, popsize, data_parallel, semi_updates, orthogonal_updates)
+        super().__init__(environment, model, criterion, optimizer, distribution, sampling, sigma, popsize, data_parallel, semi_updates, orthogonal_updates, mixed_precision, cuda_graph, compile_fitness)
         self.sigma = torch.empty((self.num_parameters), device=self.environment.device)
         self.sigma.fill_(sigma)
         self.lr_theta = torch.tensor(0.001, device=self.environment.device)
@@ -301,14 +357,17 @@ class SNESOptimizer(OpenAIESOptimizer):
         self.utilities = self.fitness_shaped.view(len(self.fitness_shaped), 1)
 
     def adapt(self):
+        noise = self.epsilon.generate_update_noise()
         #calculate theta gradient based on 10.1145/2001576.2001692
-        self.theta_gradient = torch.mm(self.epsilon.generate_update_noise().t(), self.utilities)
+        self.theta_gradient = torch.mm(noise.t(), self.utilities)
         self.theta_gradient = self.theta_gradient.view(self.num_parameters)
         #calculate sigma gradient based on 10.1145/2001576.2001692
-        self.sigma_gradient = torch.mm(( (self.epsilon.generate_update_noise()*self.epsilon.generate_update_noise()) - 1).t(), self.utilities)
+        #(noise^2 - 1)^T u is evaluated as (noise^2)^T u - sum(u), avoiding a pass over the squared noise
+        self.sigma_gradient = torch.addmm(-self.utilities.sum(), noise.square().t(), self.utilities)
         self.sigma_gradient = self.sigma_gradient.view(self.num_parameters)
         self.update_dist()
         self.update_model(self.theta)
+        self.epsilon.step()
     
     def update_dist(self):
         #update theta and sigma based on 10.1145/2001576.2001692
@@ -320,6 +379,6 @@ class SNESOptimizer(OpenAIESOptimizer):
     
     def eval_theta(self, data, target):
         self.update_model(self.theta)
-        output = self.model(data)
+        output = functional_call(self.model, self.param_dict, (data,))
         self.loss = self.criterion(output, target).item()
         return output
@@ -82,23 +82,25 @@ class DarwiNNEnvironment(object):
     def scatter(self):
         raise NotImplementedError
     
-    def all_gather(self, x, dst_list):
-        t_d.all_gather(tensor_list=dst_list, tensor=x)
+    def all_gather(self, x, dst_list, async_op=False):
+        return t_d.all_gather(tensor_list=dst_list, tensor=x, async_op=async_op)
     
-    def all_reduce(self, x):
-        t_d.all_reduce(x, op=t_d.ReduceOp.SUM)
+    def all_reduce(self, x, async_op=False):
+        return t_d.all_reduce(x, op=t_d.ReduceOp.SUM, async_op=async_op)
 
     #performs data synchronization between workers
-    def synchronize(self, x, mode="NONE", lst=None):
+    #with async_op=True, returns a handle to wait() on before using x (None if nothing was issued)
+    def synchronize(self, x, mode="NONE", lst=None, async_op=False):
         if mode == "NONE":
             pass
         elif mode == "AVERAGE":
-            self.all_reduce(x)
+            #scale before reducing so that no post-processing is needed once the collective completes
             x /= self.number_nodes
+            return self.all_reduce(x, async_op=async_op)
         elif mode == "GATHER":
             if self.number_nodes > 1:
-                self.all_gather(x,lst)
+                return self.all_gather(x,lst,async_op=async_op)
             else: #work-around for bug in Gloo for np=1
                 pass
         else:
-            raise Exception("Illegal synchronization mode")
\ No newline at end of file
+            raise Exception("Illegal synchronization mode")
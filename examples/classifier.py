@@ -57,9 +57,9 @@ class MNIST_10K(nn.Module):
   def forward(self, x):
     x = F.max_pool2d(F.relu(self.conv1(x)), 2)
     x = F.max_pool2d(F.relu(self.conv2(x)), 2)
-    x = x.view(-1, self.num_filter2*7*7)   # reshape Variable
+    x = x.reshape(-1, self.num_filter2*7*7)   # reshape Variable
     x = self.fc(x)
-    return F.log_softmax(x, dim=0)
+    return F.log_softmax(x, dim=1)
 
 #network used in arxiv 1712.06564 and 1906.03139
 class MNIST_3M(nn.Module):
@@ -81,10 +81,10 @@ class MNIST_3M(nn.Module):
   def forward(self, x):
     x = F.max_pool2d(F.relu(self.conv1(x)), 2)
     x = F.max_pool2d(F.relu(self.conv2(x)), 2)
-    x = x.view(-1, self.num_filter2*7*7)   # reshape Variable
+    x = x.reshape(-1, self.num_filter2*7*7)   # reshape Variable
     x = self.fc1(x)
     x = self.fc2(x)
-    return F.log_softmax(x, dim=0)
+    return F.log_softmax(x, dim=1)
 
 #network used in arxiv 1906.03139
 class MNIST_30K(nn.Module):
@@ -105,9 +105,9 @@ class MNIST_30K(nn.Module):
   def forward(self, x):
     x = F.max_pool2d(F.relu(self.conv1(x)), 2)
     x = F.max_pool2d(F.relu(self.conv2(x)), 2)
-    x = x.view(-1, self.num_filter2*7*7)   # reshape Variable
+    x = x.reshape(-1, self.num_filter2*7*7)   # reshape Variable
     x = self.fc(x)
-    return F.log_softmax(x, dim=0)
+    return F.log_softmax(x, dim=1)
 
 #network used in arxiv 1906.03139
 class MNIST_500K(nn.Module):
@@ -129,10 +129,10 @@ class MNIST_500K(nn.Module):
   def forward(self, x):
     x = F.max_pool2d(F.relu(self.conv1(x)), 2)
     x = F.max_pool2d(F.relu(self.conv2(x)), 2)
-    x = x.view(-1, self.num_filter2*7*7)   # reshape Variable
+    x = x.reshape(-1, self.num_filter2*7*7)   # reshape Variable
     x = self.fc1(x)
     x = self.fc2(x)
-    return F.log_softmax(x, dim=0)
+    return F.log_softmax(x, dim=1)
 
 class LeNet(nn.Module):
     def __init__(self):
@@ -148,7 +148,7 @@ class LeNet(nn.Module):
         out = F.max_pool2d(out, 2)
         out = F.relu(self.conv2(out))
         out = F.max_pool2d(out, 2)
-        out = out.view(out.size(0), -1)
+        out = out.reshape(out.size(0), -1)
         out = F.relu(self.fc1(out))
         out = F.relu(self.fc2(out))
         out = self.fc3(out)
@@ -173,7 +173,7 @@ class c10q(nn.Module):
         out = self.conv3(out)
         out = F.relu(out)
         out = F.avg_pool2d(out,kernel_size=3, stride=2, ceil_mode=True)
-        out = out.view(out.size(0), -1)
+        out = out.reshape(out.size(0), -1)
         out = self.fc1(out)
         out = F.relu(out)
         out = self.fc2(out)
@@ -213,7 +213,7 @@ class NiN(nn.Module):
 
     def forward(self, x):
         x = self.classifier(x)
-        x = x.view(x.size(0), 10)
+        x = x.reshape(x.size(0), 10)
         return x
 
 class CIF_300K(nn.Module):
@@ -290,7 +290,7 @@ class CIF_300K(nn.Module):
     def forward(self, x):
         out = self.convstack(x)
         out = F.avg_pool2d(out,kernel_size=4, stride=1, ceil_mode=True)
-        out = out.view(out.size(0), -1)
+        out = out.reshape(out.size(0), -1)
         out = self.fc(out)
         return out
         
@@ -315,7 +315,7 @@ class CIF_900K(CIF_300K):
         out = self.conv11b(out)
         out = F.relu(out)
         out = F.avg_pool2d(out,kernel_size=4, stride=1, ceil_mode=True)
-        out = out.view(out.size(0), -1)
+        out = out.reshape(out.size(0), -1)
         out = self.fc(out)
         return out
 
@@ -381,7 +381,7 @@ class CIF_8M(nn.Module):
         out = self.conv11b(out)
         out = F.relu(out)
         out = F.avg_pool2d(out,kernel_size=4, stride=1, ceil_mode=True)
-        out = out.view(out.size(0), -1)
+        out = out.reshape(out.size(0), -1)
         out = self.fc(out)
         return out
 
@@ -389,6 +389,8 @@ def train(epoch, train_loader, model, criterion, optimizer, args):
     for batch_idx, (data, target) in enumerate(train_loader):
         if args.cuda:
             data, target = data.cuda(), target.cuda()
+        if args.channels_last:
+            data = data.to(memory_format=torch.channels_last)
         if args.backprop:
             optimizer.zero_grad()
             results = model(data)
@@ -413,6 +415,8 @@ def test(test_loader, model, criterion, optimizer, args):
     for data, target in test_loader:
         if args.cuda:
             data, target = data.cuda(), target.cuda()
+        if args.channels_last:
+            data = data.to(memory_format=torch.channels_last)
         if args.backprop:
             with torch.no_grad():
                 output = model(data)
@@ -491,6 +495,14 @@ if __name__ == "__main__":
                         help='dataset location on filesystem')
     parser.add_argument('--profile', action='store_true', default=False,
                         help='profile training process (default off)')
+    parser.add_argument('--channels-last', action='store_true', default=False,
+                        help='use channels_last memory format for models and inputs (default off)')
+    parser.add_argument('--mixed-precision', action='store_true', default=False,
+                        help='evaluate neuroevolution fitness in BF16 (default off)')
+    parser.add_argument('--cuda-graph', action='store_true', default=False,
+                        help='replay neuroevolution fitness evaluation from a CUDA graph (default off)')
+    parser.add_argument('--compile', action='store_true', default=False,
+                        help='compile neuroevolution fitness evaluation with torch.compile (default off)')
 
     args = parser.parse_args()
     args.cuda = not args.no_cuda and torch.cuda.is_available()
@@ -534,6 +546,9 @@ if __name__ == "__main__":
         else:
             raise ValueError("Requested topology not available for specified dataset")
     
+    if args.channels_last:
+        model = model.to(memory_format=torch.channels_last)
+
     if args.backprop:
         args.ddp = True
 
@@ -565,11 +580,11 @@ if __name__ == "__main__":
     #if doing neuroevolution, wrap optimizer into a NE optimizer
     if not args.backprop:
         if args.ne_opt == 'OpenAI-ES':
-            optimizer = OpenAIESOptimizer(env, model, loss_criterion, optimizer, sigma=args.sigma, popsize=args.popsize, distribution=args.noise_dist, sampling=args.sampling, data_parallel=args.ddp, semi_updates=args.semi_updates, orthogonal_updates=args.orthogonal_updates)
+            optimizer = OpenAIESOptimizer(env, model, loss_criterion, optimizer, sigma=args.sigma, popsize=args.popsize, distribution=args.noise_dist, sampling=args.sampling, data_parallel=args.ddp, semi_updates=args.semi_updates, orthogonal_updates=args.orthogonal_updates, mixed_precision=args.mixed_precision, cuda_graph=args.cuda_graph, compile_fitness=args.compile)
         elif args.ne_opt == 'SNES':
-            optimizer = SNESOptimizer(env, model, loss_criterion, optimizer, sigma=args.sigma, popsize=args.popsize, distribution=args.noise_dist, sampling=args.sampling, data_parallel=args.ddp, semi_updates=args.semi_updates, orthogonal_updates=args.orthogonal_updates)
+            optimizer = SNESOptimizer(env, model, loss_criterion, optimizer, sigma=args.sigma, popsize=args.popsize, distribution=args.noise_dist, sampling=args.sampling, data_parallel=args.ddp, semi_updates=args.semi_updates, orthogonal_updates=args.orthogonal_updates, mixed_precision=args.mixed_precision, cuda_graph=args.cuda_graph, compile_fitness=args.compile)
         elif args.ne_opt == 'GA':
-            optimizer = GAOptimizer(env, model, loss_criterion, sigma=args.sigma, popsize=args.popsize, data_parallel=args.ddp)
+            optimizer = GAOptimizer(env, model, loss_criterion, sigma=args.sigma, popsize=args.popsize, data_parallel=args.ddp, mixed_precision=args.mixed_precision, cuda_graph=args.cuda_graph, compile_fitness=args.compile)
 
     if args.profile:
         duration = time.time()
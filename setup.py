@@ -43,6 +43,6 @@ setuptools.setup(
       author_email="lucianp@xilinx.com",
       url="https://github.com/Xilinx/DarwiNN",
       python_requires=">=3.6",
-      install_requires=["torch>=1.1.0","deap"],
+      install_requires=["torch>=2.0.0","deap"],
       packages=setuptools.find_packages()
 )